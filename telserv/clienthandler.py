@@ -9,9 +9,29 @@
 
 from .telnet_860 import TelnetOptions, TelnetCommands
 
-import time
+import asyncio
+import functools
 import struct
-import io
+
+# Raw byte lookups for the IAC parser, avoids Enum construction per sequence
+_IAC = TelnetCommands.IAC.value
+_SB = TelnetCommands.SB.value
+_IAC_SE = bytes([TelnetCommands.IAC.value, TelnetCommands.SE.value])
+_NEGOTIATION_CMDS = frozenset({
+    TelnetCommands.DO.value,
+    TelnetCommands.DONT.value,
+    TelnetCommands.WILL.value,
+    TelnetCommands.WONT.value,
+})
+_CMD_BY_INT = {cmd.value: cmd for cmd in TelnetCommands}
+_OPT_BY_INT = {opt.value: opt for opt in TelnetOptions}
+
+@functools.lru_cache(maxsize=4096)
+def _cursor_move(x: int, y: int) -> bytes:
+    """
+    CSI cursor position sequence, sized to hold every cell of a typical terminal
+    """
+    return b'\x1b[%d;%dH' % (y, x)
 
 class ClientOptions:
     def __init__(self, options={}) -> None:
@@ -33,61 +53,86 @@ class ClientOptions:
         for func in self.event_handlers[opt]:
             func()
     
-    def iac_sb(self, data: io.BytesIO) -> bytes:
-        opt = data.read(1)
-        try:
-            opt = TelnetOptions(opt[0])
-        except ValueError:
-            d = data.read(1)
-            while d[0] != TelnetCommands.SE.value:
-                d = data.read(1)
-            return b""
+    def iac_sb(self, data: bytes, pos: int) -> int:
+        """
+        Process the subnegotiation whose option byte is at data[pos].
+        Returns the position just past its IAC SE, or -1 if its IAC SE has not
+        arrived yet. Nothing is processed then, the caller keeps the subnegotiation
+        and calls again once more data has been appended.
+        """
+        end = data.find(_IAC_SE, pos)
+        if end == -1:
+            return -1
+        if end == pos:
+            return end + 2 # No option byte at all
+
+        opt = _OPT_BY_INT.get(data[pos])
+        if opt is None:
+            return end + 2
         
         if opt == TelnetOptions.NEGOTIATE_ABOUT_WINDOW_SIZE:
-            w,h = struct.unpack(">HH", data.read(4))
+            if end - pos == 5:
+                w,h = struct.unpack_from(">HH", data, pos + 1)
+            else:
+                # A size byte of 255 arrives doubled as IAC IAC
+                payload = data[pos+1:end].replace(b'\xff\xff', b'\xff')
+                if len(payload) != 4:
+                    return end + 2
+                w,h = struct.unpack(">HH", payload)
             self.opts["window_size"] = (w, h)
-            data.read(2) # Skip IAC SE
             self.__dispatch_event(opt) # Dispatch event (after processing)
-            return b""
+            return end + 2
         
-        # Skip until IAC SE
-        d = data.read(1)
-        while d[0] != TelnetCommands.SE.value:
-            d = data.read(1)
         self.__dispatch_event(opt) # Dispatch event
-        return b""
-
-    def iac(self, data: bytes) -> bytes:
-        data = io.BytesIO(data)
-        ret = b""
-        while True:
-            iac = data.read(1)
-            if not iac or iac[0] != TelnetCommands.IAC.value:
+        return end + 2
+
+    def iac(self, data: bytes) -> tuple:
+        """
+        Process every IAC sequence in data.
+        Returns (reply, application data, consumed) where reply holds the negotiation
+        responses for the client, application data is data with all IAC sequences
+        stripped out and consumed is how far data was processed. A sequence cut off
+        at the end is left unconsumed, pass data[consumed:] back in with the next read.
+        """
+        ret = bytearray()
+        app = bytearray()
+        pos = 0
+        end = len(data)
+        while pos < end:
+            # Jump straight to the next IAC, everything before it is application data
+            nxt = data.find(_IAC, pos)
+            if nxt == -1:
+                app += data[pos:]
+                pos = end
+                break
+            app += data[pos:nxt]
+            pos = nxt
+            if nxt + 1 >= end:
                 break
-            cmd = data.read(1)
-            try:
-                cmd = TelnetCommands(cmd[0])
-            except ValueError:
-                continue
 
-            if cmd in (TelnetCommands.DO, 
-                       TelnetCommands.DONT, 
-                       TelnetCommands.WILL, 
-                       TelnetCommands.WONT):
+            cmd = data[nxt+1]
+            if cmd in _NEGOTIATION_CMDS:
+                if nxt + 2 >= end:
+                    break
+                pos = nxt + 3
                 # Read option
-                opt = data.read(1)
-                try:
-                    opt = TelnetOptions(opt[0])
-                except ValueError:
+                opt = _OPT_BY_INT.get(data[nxt+2])
+                if opt is None:
                     continue
                 # Process option
-                ret += self.iac_one(cmd, opt)
+                ret += self.iac_one(_CMD_BY_INT[cmd], opt)
                 self.__dispatch_event(opt) # Dispatch event
-                continue
-            elif cmd == TelnetCommands.SB:
-                ret += self.iac_sb(data)
-                continue
-        return ret
+            elif cmd == _SB:
+                sb_end = self.iac_sb(data, nxt + 2)
+                if sb_end == -1:
+                    break # Leave IAC SB unconsumed until its IAC SE arrives
+                pos = sb_end
+            elif cmd == _IAC:
+                app += data[nxt:nxt+1] # Escaped 0xFF data byte
+                pos = nxt + 2
+            else:
+                pos = nxt + 2
+        return bytes(ret), bytes(app), pos
 
     def iac_one(self, cmd: TelnetCommands, opt: TelnetOptions) -> bytes:
         if cmd == TelnetCommands.DO:
@@ -103,19 +148,21 @@ class ClientOptions:
         return b""
     
     def send_one(self, cmd: TelnetCommands, opt: TelnetOptions) -> bytes:
-        return bytes([TelnetCommands.IAC.value, cmd.value, opt.value])
+        return bytes((_IAC, cmd.value, opt.value))
 
     def send(self, *opts) -> bytes:
-        data = b""
+        data = bytearray()
         for opt in opts:
             data += self.send_one(*opt)
-        return data
+        return bytes(data)
     
     def send_all_opts(self) -> bytes:
-        data = b""
-        for opt in self.opts:
-            data += self.send_one(TelnetCommands.DO, opt)
-        return data
+        # opts also holds plain settings such as window_size, only negotiate real options
+        opts = [opt for opt in self.opts if isinstance(opt, TelnetOptions)]
+        data = bytearray(3 * len(opts))
+        for i, opt in enumerate(opts):
+            data[3*i:3*i+3] = (_IAC, TelnetCommands.DO.value, opt.value)
+        return bytes(data)
 
     def __repr__(self) -> str:
         data = "<ClientOptions>\n"
@@ -130,21 +177,188 @@ class ClientOptions:
         return self.opts[opt]
 
 class DumbTerminal:
-    def __init__(self, conn, options: ClientOptions) -> None:
-        self.conn = conn
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, options: ClientOptions) -> None:
+        self.reader = reader
+        self.writer = writer
         self.options: ClientOptions = options
+        self._frame_buf = None
+
+        # Shadow framebuffer: _prev is what the client is showing (None if unknown),
+        # _next is the frame being drawn. Cells are single characters, rows are lists.
+        self._size = (0, 0)
+        self._prev = None
+        self._next = None
+        self._grid = False
+        self._grid_dirty = False
+        self._cursor = (0, 0)
+        self._term_cursor = None # Where the client's cursor really is, None if unknown
+
+        # The connection owns the reader, input() is handed lines through feed()
+        self._input_waiter = None
+        self._input_buf = bytearray()
+        self._eof = False
+
+    def begin_frame(self):
+        """
+        Hold back all output until end_frame so a whole frame goes out in one send.
+        Text printed during the frame is drawn into the shadow framebuffer and only
+        the cells that differ from what the client already shows are sent.
+        """
+        self._frame_buf = bytearray()
+        # Local echo or a resize can move the cursor between frames, so each frame
+        # starts from an absolute move and only uses relative motion after that
+        self._term_cursor = None
+
+        w, h = self.options.opts["window_size"]
+        if (w, h) != self._size:
+            self._size = (w, h)
+            self._prev = None
+        # Without a window size there is nothing to diff against, write straight through
+        self._grid = w > 0 and h > 0
+        if self._grid:
+            if self._prev is None:
+                self._next = [[" "] * w for _ in range(h)]
+            else:
+                self._next = [row[:] for row in self._prev]
+        self._grid_dirty = self._prev is None
+
+    def end_frame(self):
+        if self._grid:
+            self.__sync_grid()
+            # Leave the client's cursor where the frame left the logical one
+            if self._term_cursor != self._cursor:
+                col, row = self._cursor
+                self._frame_buf += _cursor_move(col + 1, row + 1)
+                self._term_cursor = self._cursor
+            self._grid = False
+        else:
+            self._term_cursor = None
+
+        buf, self._frame_buf = self._frame_buf, None
+        if buf:
+            self.writer.write(buf)
+
+    def __sync_grid(self):
+        """
+        Append the changed runs of cells in _next to the frame buffer
+        """
+        if not self._grid_dirty:
+            return
+        self._grid_dirty = False
+
+        w, h = self._size
+        buf = self._frame_buf
+        if self._prev is None:
+            buf += b'\x1b[2J'
+            self._prev = [[" "] * w for _ in range(h)]
+
+        for y in range(h):
+            prev, nxt = self._prev[y], self._next[y]
+            if prev == nxt:
+                continue
+            x = 0
+            while x < w:
+                if prev[x] == nxt[x]:
+                    x += 1
+                    continue
+                start = x
+                while True:
+                    while x < w and prev[x] != nxt[x]:
+                        x += 1
+                    # Resending a few unchanged cells is cheaper than another cursor move
+                    gap = x
+                    while gap < w and gap - x < 8 and prev[gap] == nxt[gap]:
+                        gap += 1
+                    if gap == w or gap - x >= 8:
+                        break
+                    x = gap
+                self.__move_to(start, y)
+                buf += "".join(nxt[start:x]).encode('utf-8')
+                self._term_cursor = (x, y) if x < w else None # Unknown once it hits the margin
+            self._prev[y] = nxt[:]
+
+    def __move_to(self, col: int, row: int):
+        """
+        Append the shortest motion from the client's cursor to (col, row).
+        Only called from __sync_grid, where the cells left of col on row are
+        already up to date on the client and can be rewritten to get there.
+        """
+        move = _cursor_move(col + 1, row + 1)
+        if self._term_cursor is not None:
+            term_col, term_row = self._term_cursor
+            if term_row == row and term_col == col:
+                return
+            # Walk down with CR LF and retype the start of the row instead of a CSI,
+            # every cell is at least one byte so skip building it when it can't win
+            if term_row < row and 2 * (row - term_row) + col < len(move):
+                buf = self._frame_buf
+                start = len(buf)
+                buf += b'\r\n' * (row - term_row)
+                buf += "".join(self._next[row][:col]).encode('utf-8')
+                if len(buf) - start < len(move):
+                    return
+                del buf[start:]
+        self._frame_buf += move
+
+    def __put(self, text: str):
+        """
+        Draw text into _next at the cursor, clipping it to the window
+        """
+        w, h = self._size
+        col, row = self._cursor
+        if "\r" not in text and "\n" not in text:
+            if 0 <= row < h and col < w:
+                line = self._next[row]
+                line[col:col+len(text)] = text[:w-col]
+                del line[w:]
+            col += len(text)
+        else:
+            for c in text:
+                if c == "\r":
+                    col = 0
+                elif c == "\n":
+                    row += 1
+                else:
+                    if 0 <= row < h and col < w:
+                        self._next[row][col] = c
+                    col += 1
+        self._cursor = (col, row)
+        self._grid_dirty = True
 
     def send_raw(self, data: bytes):
-        self.conn.send(data)
+        if self._frame_buf is not None:
+            if self._grid:
+                self.__sync_grid()
+            self._frame_buf += data
+        else:
+            self._term_cursor = None
+            self.writer.write(data)
     
     def set_cursor(self, x: int, y: int):
-        self.send_raw(b'\x1b[%d;%dH' % (y, x))
+        if self._grid:
+            # Terminal coordinates are 1-based, 0 is treated as 1
+            self._cursor = (max(x, 1) - 1, max(y, 1) - 1)
+            return
+        self.send_raw(_cursor_move(x, y))
     
     def clear_screen(self):
+        if self._grid:
+            self._next = [[" "] * self._size[0] for _ in range(self._size[1])]
+            self._grid_dirty = True
+            return
+        if self._frame_buf is None:
+            self._prev = None # Client screen no longer matches the shadow framebuffer
         self.send_raw(b'\x1b[2J')
     
     def cursor_blink(self, enabled: bool):
-        self.send_raw(b'\x1b[?25h' if enabled else b'\x1b[?25l')
+        data, undo = (b'\x1b[?25h', b'\x1b[?25l') if enabled else (b'\x1b[?25l', b'\x1b[?25h')
+        if self._frame_buf is not None:
+            if self._grid:
+                self.__sync_grid()
+            # Toggling back and forth with nothing drawn in between only needs the last one
+            if self._frame_buf.endswith(undo):
+                del self._frame_buf[-len(undo):]
+        self.send_raw(data)
 
     def print_centered(self, data: str, line_y: int, **kwargs):
         args = {
@@ -152,7 +366,7 @@ class DumbTerminal:
             **kwargs
         }
 
-        w, h = self.options.get("window_size")
+        w, h = self.options.opts["window_size"]
         self.set_cursor((w - len(data)) // 2, line_y)
         self.print(data, **args)
     
@@ -165,27 +379,58 @@ class DumbTerminal:
             x, y = args
             self.set_cursor(x, y)
 
+        if self._grid:
+            self.__put(data)
+            self.__put(optargs['end'])
+            return
+        if self._frame_buf is None:
+            self._prev = None # Client screen no longer matches the shadow framebuffer
         self.send_raw(f"{data}{optargs['end']}".encode('utf-8'))
     
-    def input(self, **kwargs):
+    async def input(self, **kwargs):
         optargs = {
             "replace": None,
             **kwargs
         }
-        strbuild = b""
-        while True:
-            data = self.conn.recv(1)
-            if not data:
-                break
-            strbuild += data
-            if data == b'\r':
-                break
+        if self._eof:
+            return b""
+        if self._input_waiter is not None:
+            raise RuntimeError("input() is already waiting for a line")
+        self._input_waiter = asyncio.get_running_loop().create_future()
+        try:
+            return await self._input_waiter
+        finally:
+            self._input_waiter = None
+
+    def feed(self, data: bytes):
+        """
+        Hand application data read by the connection to a waiting input() call.
+        Data that arrives while nobody is waiting is not kept.
+        """
+        if self._input_waiter is None or self._input_waiter.done():
+            return
+        end = data.find(b'\r')
+        if end == -1:
+            self._input_buf += data
+            return
+        self._input_buf += data[:end]
+        self._input_waiter.set_result(bytes(self._input_buf))
+        self._input_buf.clear()
+
+    def feed_eof(self):
+        """
+        The connection is gone, a waiting input() gets the partial line
+        """
+        self._eof = True
+        if self._input_waiter is not None and not self._input_waiter.done():
+            self._input_waiter.set_result(bytes(self._input_buf))
+        self._input_buf.clear()
 
 class RenderableElement:
     def __init__(self):
         self.enabled = True
 
-    def draw(self, term: DumbTerminal):
+    def draw(self, term: DumbTerminal, w: int, h: int):
         raise NotImplementedError()
     
     def get_position(self):
@@ -205,25 +450,17 @@ class ClientRenderer:
         self.ch = ch
         self.dumbterm = ch.dumbterm
 
-        self.pre_render_tasks = []
-        self.post_render_tasks = []
+        self._pre = []
+        self._post = []
         self.screen = None
 
         self.ch.options.on(TelnetOptions.NEGOTIATE_ABOUT_WINDOW_SIZE, self.render)
     
     def on(self, event: int, func):
         if event == self.PRERENDER:
-            self.pre_render_tasks.append(func)
+            self._pre.append(func)
         elif event == self.POSTRENDER:
-            self.post_render_tasks.append(func)
-    
-    def dispatch_event(self, event: int):
-        if event == self.PRERENDER:
-            for func in self.pre_render_tasks:
-                func()
-        elif event == self.POSTRENDER:
-            for func in self.post_render_tasks:
-                func()
+            self._post.append(func)
     
     def set_screen(self, screen):
         if self.screen:
@@ -235,15 +472,25 @@ class ClientRenderer:
         self.render()
     
     def render(self):
-        self.dispatch_event(self.PRERENDER)
+        # Render tasks belong to screens, nothing to do without one
         if not self.screen:
             return
-        
-        self.dumbterm.clear_screen()
-        for element in self.screen.elements:
-            if element.enabled:
-                element.draw(self.dumbterm)
-        self.dispatch_event(self.POSTRENDER)
+
+        self.dumbterm.begin_frame()
+        try:
+            for func in self._pre:
+                func()
+            
+            self.dumbterm.clear_screen()
+            w, h = self.dumbterm.options.opts["window_size"]
+            for element in self.screen.live_elements():
+                if element.enabled:
+                    element.draw(self.dumbterm, w, h)
+
+            for func in self._post:
+                func()
+        finally:
+            self.dumbterm.end_frame()
 
 class TextElement(RenderableElement):
     def __init__(self, text: str, **kwargs) -> None:
@@ -253,6 +500,7 @@ class TextElement(RenderableElement):
         self.args = {
             "x": 0,
             "y": 0,
+            "end": "\r\n",
             "offset_x": 0,
             "offset_y": 0,
             "centered_y": False,
@@ -260,28 +508,36 @@ class TextElement(RenderableElement):
             **kwargs
         }
 
-    def get_position(self, term: DumbTerminal):
-        w, h = term.options.get("window_size")
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str):
+        self._text = text
+        self._text_len = len(text)
+
+    def get_position(self, w: int, h: int):
         x, y = self.args["x"], self.args["y"]
 
         if self.args["x"] == -1:
-            x = w - len(self.text)
+            x = w - self._text_len
         if self.args["y"] == -1:
-            y = h - len(self.text)
+            y = h - self._text_len
 
         if self.args["centered_y"]:
             y = (h // 2) + self.args["offset_y"]
         if self.args["centered_x"]:
-            x = (w - len(self.text)) // 2 + self.args["offset_x"]
+            x = (w - self._text_len) // 2 + self.args["offset_x"]
         return (x, y)
     
     def set_position(self, x: int, y: int):
         self.args["x"] = x
         self.args["y"] = y
 
-    def draw(self, term: DumbTerminal):
-        x, y = self.get_position(term)
-        term.print(self.text, x, y)
+    def draw(self, term: DumbTerminal, w: int, h: int):
+        x, y = self.get_position(w, h)
+        term.print(self._text, x, y, end=self.args["end"])
 
 class InputElement(RenderableElement):
     def __init__(self, **kwargs) -> None:
@@ -303,7 +559,7 @@ class InputElement(RenderableElement):
         self.args["x"] = x
         self.args["y"] = y
 
-    def draw(self, term: DumbTerminal):
+    def draw(self, term: DumbTerminal, w: int, h: int):
         if self.args["override_char"]:
             term.print(self.args["override_char"] * len(self.current_text), self.args["x"], self.args["y"], end="")
         else:
@@ -314,17 +570,62 @@ class Screen:
         self.elements = []
         self.enabled = False
         self.client = client
+        # Removing only marks an entry, like list.remove it is always the first one
+        # still on the screen, so per element counts say which entries are gone
+        self._live = {} # Element -> entries still on the screen
+        self._dead = {} # Element -> leading entries removed, awaiting compaction
+        self._dead_count = 0
+
+    def live_elements(self):
+        """
+        Yield the elements on the screen in the order they were added
+        """
+        if not self._dead:
+            yield from self.elements
+            return
+        skip = dict(self._dead)
+        for element in self.elements:
+            if skip.get(element):
+                skip[element] -= 1
+                continue
+            yield element
+
+    def __compact(self):
+        self.elements = list(self.live_elements())
+        self._dead.clear()
+        self._dead_count = 0
 
     def add_element(self, element: RenderableElement):
         self.elements.append(element)
+        self._live[element] = self._live.get(element, 0) + 1
 
     def remove_element(self, element: RenderableElement):
-        self.elements.remove(element)
+        # Mark instead of list.remove, dead entries are skipped when rendering
+        # and swept out once they outnumber the live ones
+        count = self._live.get(element)
+        if not count:
+            raise ValueError("Screen.remove_element(x): x not in screen")
+        if count == 1:
+            del self._live[element]
+        else:
+            self._live[element] = count - 1
+        self._dead[element] = self._dead.get(element, 0) + 1
+        self._dead_count += 1
+        if 2 * self._dead_count > len(self.elements):
+            self.__compact()
 
 class StudentSearchScreen(Screen):
     SEARCH = 0
     RESULTS = 1
 
+    # Column widths of CLASS #, COURSE TITLE, GRADE, TEACHER, PERIOD (ROOM is last)
+    _S1, _S2, _S3, _S4, _S5 = 10, 21, 8, 10, 9
+    _ROW_FMT = f"{{:<{_S1}}}{{:<{_S2}}}{{:<{_S3}}}{{:<{_S4}}}{{:<{_S5}}}{{}}".format
+
+    # Offsets of the editable GRADE and PERIOD columns from the start of a row
+    _COL_GRADE = _S1 + _S2
+    _COL_PERIOD = _S1 + _S2 + _S3 + _S4
+
     def __init__(self, client) -> None:
         super().__init__(client)
 
@@ -354,11 +655,8 @@ class StudentSearchScreen(Screen):
         self.add_element(self.input1)
     
     def __setup_results(self):
-        for element in self.grade_elements:
-            self.remove_element(element)
-
         if len(self.grade_elements) == 0:
-            self.te2 = TextElement("CLASS #   COURSE TITLE         GRADE   TEACHER   PERIOD   ROOM", x=0, y=3, centered_x=True)
+            self.te2 = TextElement(self._ROW_FMT("CLASS #", "COURSE TITLE", "GRADE", "TEACHER", "PERIOD", "ROOM"), x=0, y=3, centered_x=True)
             self.te3 = TextElement("─" * len(self.te2.text), x=0, y=4, centered_x=True)
             self.te4 = TextElement("TO CHANGE ANY ITEM, MOVE CURSOR TO DESIRED POSITION AND ENTER NEW VALUE", x=0, y=6+len(self.grades))
 
@@ -366,24 +664,14 @@ class StudentSearchScreen(Screen):
             self.add_element(self.te3)
             self.add_element(self.te4)
 
-        self.grade_elements = []
-
-        for i, grade in enumerate(self.grades):
-            class_num, title, grade, teacher, period, room = grade
+            for i in range(len(self.grades)):
+                element = TextElement("", x=0, y=5+i, centered_x=True)
+                self.grade_elements.append(element)
+                self.add_element(element)
 
-            s1 = " " * (len("CLASS #   ") - len(class_num))
-            s2 = " " * (len("COURSE TITLE         ") - len(title))
-            s3 = " " * (len("GRADE   ") - len(grade))
-            s4 = " " * (len("TEACHER   ") - len(teacher))
-            s5 = " " * (len("PERIOD   ") - len(period))
-
-            text = f"{class_num}{s1}{title}{s2}{grade}{s3}{teacher}{s4}{period}{s5}{room}"
-            element = TextElement(text, x=0, y=5+i, centered_x=True)
-
-            self.grade_elements.append(element)
-            
-        for element in self.grade_elements:
-            self.add_element(element)
+        # Rows are updated in place, the elements themselves never change
+        for element, grade in zip(self.grade_elements, self.grades):
+            element.text = self._ROW_FMT(*grade)
 
     def __handle_input_results(self, data: bytes):
         if data in (b'\x1b[C', b'\x1b[A'):
@@ -404,8 +692,12 @@ class StudentSearchScreen(Screen):
             else:
                 self.grades[self.cursor_idx//2][4] = data.decode()
 
-        self.__setup_results()
-        self.client.renderer.render()
+            self.__setup_results()
+            self.client.renderer.render()
+            return
+
+        # Moving the cursor changes nothing on screen
+        self.client.dumbterm.set_cursor(*self.cursor_positions[self.cursor_idx])
         
     def __handle_input_search(self, data: bytes):
         if data.endswith(b'\r\x00'):
@@ -419,22 +711,13 @@ class StudentSearchScreen(Screen):
         self.client.renderer.render()
 
     def __calculate_cursor_positions(self):
-        self.cursor_positions = []
-        for element in self.grade_elements:
-            base_x, base_y = element.get_position(self.client.dumbterm)
-
-            s1 = len("CLASS #   ")
-            s2 = len("COURSE TITLE         ")
-            s3 = len("GRADE   ")
-            s4 = len("TEACHER   ")
-            s5 = len("PERIOD   ")
-
-            # self.cursor_positions.append((base_x, base_y))
-            # self.cursor_positions.append((base_x + s1, base_y))
-            self.cursor_positions.append((base_x + s1 + s2, base_y))
-            # self.cursor_positions.append((base_x + s1 + s2 + s3, base_y))
-            self.cursor_positions.append((base_x + s1 + s2 + s3 + s4, base_y))
-            # self.cursor_positions.append((base_x + s1 + s2 + s3 + s4 + s5, base_y))
+        self.cursor_positions = [None] * (2 * len(self.grade_elements))
+        w, h = self.client.dumbterm.options.opts["window_size"]
+        for i, element in enumerate(self.grade_elements):
+            base_x, base_y = element.get_position(w, h)
+
+            self.cursor_positions[2*i] = (base_x + self._COL_GRADE, base_y)
+            self.cursor_positions[2*i+1] = (base_x + self._COL_PERIOD, base_y)
 
     def __handle_prerender(self):
         if not self.enabled:
@@ -485,20 +768,23 @@ class LoginScreen(Screen):
         self.add_element(self.te4)
         self.add_element(self.input1)
     
+    def __show_search_screen(self):
+        self.client.renderer.set_screen(StudentSearchScreen(self.client))
+
     def __handle_input(self, data: bytes):
-        if not self.enabled:
+        # Input is ignored while the password result is on screen
+        if not self.enabled or self.input1.input_done:
             return
 
         if data.endswith(b'\r\x00'):
             self.input1.input_done = True
             if self.input1.current_text != b'pencil':
                 self.client.dumbterm.print("\r\n\r\n!!!INVALID PASSWORD!!! TERMINATING CONNECTION.\r\n\r\n", end="")
-                time.sleep(2)
-                self.client.close()
+                self.client.ch.call_later(2, self.client.close)
                 return
             self.client.dumbterm.print("\r\n\r\nPASSWORD VERIFIED\r\n\r\n", end="")
-            time.sleep(2)
-            self.client.renderer.set_screen(StudentSearchScreen(self.client))
+            self.client.ch.call_later(2, self.__show_search_screen)
+            return
 
         elif data == b'\x7f':
             self.input1.current_text = self.input1.current_text[:-1]
@@ -522,7 +808,7 @@ class Client:
         self.dumbterm.cursor_blink(True)
         self.dumbterm.set_cursor(0, 0)
 
-        self.ch.conn.close()
+        self.ch.close()
 
     def __setup_input_screen(self):
         self.input_screen = LoginScreen(self)
@@ -7,10 +7,12 @@
 # LICENSE.md file at the root of the source code directory
 # --------------------------------------------------------------------------------
 
+import asyncio
+import os
 import socket
+import sys
 import threading
 import traceback
-import time 
 import io
 import struct
 
@@ -18,6 +20,15 @@ from telserv import __version__, TelnetCommands, TelnetOptions, DumbTerminal, Cl
 from dataclasses import dataclass
 from enum import Enum
 
+# Negotiation sent to every client as soon as it connects
+_INITIAL_HANDSHAKE = bytes([
+    TelnetCommands.IAC, TelnetCommands.WILL, TelnetOptions.ECHO,              # Please disable local echo
+    TelnetCommands.IAC, TelnetCommands.WILL, TelnetOptions.SUPPRESS_GO_AHEAD, # Please suppress go ahead
+    TelnetCommands.IAC, TelnetCommands.DO, TelnetOptions.NEGOTIATE_ABOUT_WINDOW_SIZE, # Please send window size
+])
+# Longest unfinished IAC sequence carried over between reads
+_MAX_PENDING = 4096
+
 class TelnetServer:
     def __init__(self, **kwargs):
         default = {
@@ -27,26 +38,76 @@ class TelnetServer:
             "client_handler": ClientHandler
         }
         self.args = {**default, **kwargs}
-        self.sock = socket.socket(socket.AF_INET if not self.args['ipv6'] else socket.AF_INET, 
-                                  socket.SOCK_STREAM)
+
+        # Resolve once, the family follows the address (an IPv6 host only resolves with ipv6 enabled)
+        host = self.args['host'] or None # getaddrinfo rejects "" as a wildcard
+        if host is None and self.args['ipv6']:
+            # A wildcard would resolve to 0.0.0.0 first, bind :: so the socket is dual-stack
+            family = socket.AF_INET6
+        else:
+            family = socket.AF_UNSPEC if self.args['ipv6'] else socket.AF_INET
+        family, _, _, _, self.sockaddr = socket.getaddrinfo(
+            host, self.args['port'], family,
+            socket.SOCK_STREAM, 0, socket.AI_PASSIVE
+        )[0]
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET6:
+            # Dual-stack, also accept IPv4 clients as mapped addresses
+            self.sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
 
     def run(self):
         """ 
         Run the server forever
         """
-        self.sock.bind((self.args['host'], self.args['port']))
+        if os.name == "posix":
+            # Allow restarting while old connections sit in TIME_WAIT (means something else on Windows)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(self.sockaddr)
         self.sock.listen(1)
+        self.sock.setblocking(False)
 
+        self.interrupted = False
+        try:
+            asyncio.run(self.__serve())
+        except KeyboardInterrupt:
+            # Before Python 3.11 Ctrl+C escapes asyncio.run instead of cancelling __serve,
+            # which only gets cancelled while asyncio.run cleans up (if it had started)
+            if not self.interrupted:
+                print("\rKeyboard interrupt detected, stopping server...")
+                self.sock.close()
+                print("Server stopped")
+
+    async def __serve(self):
         self.client_pool = []
-        self.stop_signal = threading.Event()
-        
-        self.server_thread = threading.Thread(
-            target=self.__run_forever,
-            daemon=True
-        )
-        self.server_thread.start()
+        self.stop_signal = asyncio.Event()
+        self.server = await asyncio.start_server(self.__handle, sock=self.sock)
 
-        ServerConsole(self).console()
+        console = asyncio.create_task(ServerConsole(self).console())
+        stopped = asyncio.create_task(self.stop_signal.wait())
+        try:
+            await asyncio.wait((console, stopped), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # asyncio.run cancels the main task on Ctrl+C, finishing normally makes it a clean exit
+            self.interrupted = True
+            print("\rKeyboard interrupt detected, stopping server...")
+            console.cancel()
+            stopped.cancel()
+            self.stop()
+            await self.__wait_clients()
+            print("Server stopped")
+            return
+
+        self.stop()
+        stopped.cancel()
+        await self.__wait_clients()
+        if console.done():
+            console.result() # A console that died rather than stopping the server re-raises here
+        else:
+            console.cancel()
+
+    async def __wait_clients(self):
+        await self.server.wait_closed()
+        await asyncio.gather(*(client.task for client in self.client_pool), return_exceptions=True)
     
     def stop(self):
         """
@@ -56,51 +117,33 @@ class TelnetServer:
             return
         self.stop_signal.set()
 
+        self.server.close()
         for client in self.client_pool:
-            client.hard_kill_signal.set()
-            client.client_thread.join()
-        self.sock.close()
+            client.handler.close()
 
-    def __clean_dead_threads(self):
-        """
-        Clean up dead threads
-        """
-        for client in self.client_pool:
-            if not client.client_thread.is_alive() or client.hard_kill_signal.is_set():
-                self.client_pool.remove(client)
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        addr = writer.get_extra_info("peername")
+
+        # Every frame is one write that should hit the wire now, and dead peers should be noticed
+        conn = writer.get_extra_info("socket")
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 
-    def __run_forever(self):
-        zombie_timer = time.time()
+        handler = self.args["client_handler"](reader, writer, addr)
+        client_connection = ClientConnection(writer, addr, handler, asyncio.current_task())
+
+        self.client_pool.append(client_connection)
         try:
-            while not self.stop_signal.is_set():
-                if time.time() - zombie_timer > 5:
-                    self.__clean_dead_threads()
-                    zombie_timer = time.time()
-
-                # Accept new connections
-                self.sock.settimeout(10)
-                try:
-                    conn, addr = self.sock.accept()
-                except socket.timeout:
-                    continue
-
-                hard_kill_signal = threading.Event()
-                handler = self.args["client_handler"](conn, addr, hard_kill_signal)
-                client_thread = handler.run_threaded()
-                client_connection = ClientConnection(conn, addr, hard_kill_signal, client_thread, handler)
-
-                self.client_pool.append(client_connection)
-        except:
-            traceback.print_exc() # Print stack trace on error
-        self.stop() # Gracefully stop the server
+            await handler.run()
+        finally:
+            self.client_pool.remove(client_connection)
 
 @dataclass
 class ClientConnection:
-    conn: socket.socket
+    writer: asyncio.StreamWriter
     addr: tuple
-    hard_kill_signal: threading.Event
-    client_thread: threading.Thread
     handler: object
+    task: asyncio.Task
 
     def __repr__(self) -> str:
         return f"<ClientConnection {self.addr}>"
@@ -112,50 +155,86 @@ class ServerConsole:
     def print_console(self, message):
         print(f"\r{message}\n> ", end="")
 
-    def console(self):
+    def __read_stdin(self, loop: asyncio.AbstractEventLoop, lines: asyncio.Queue):
+        """
+        Feed stdin lines to the console from a daemon thread. Reads the raw fd,
+        a thread parked in input() would hold sys.stdin's lock at interpreter exit.
+        """
+        buf = b""
+        while True:
+            data = os.read(sys.stdin.fileno(), 1024)
+            buf += data
+            *complete, buf = buf.split(b"\n")
+            new_lines = [line.decode(errors="replace").rstrip("\r") for line in complete]
+            if not data:
+                new_lines.append(None) # EOF
+            try:
+                for line in new_lines:
+                    loop.call_soon_threadsafe(lines.put_nowait, line)
+            except RuntimeError:
+                return # Event loop is gone
+            if not data:
+                return
+
+    async def console(self):
+        lines = asyncio.Queue()
+        threading.Thread(
+            target=self.__read_stdin,
+            args=(asyncio.get_running_loop(), lines),
+            daemon=True
+        ).start()
+
         self.print_console(f"TelServ v{__version__} Console")
-        try:
-            while True:
-                cmd = input()
-                args = cmd.split(" ")
-                if args[0] == 'clients':
-                    buf = "Connected clients:\n"
-                    for i,client in enumerate(self.server.client_pool):
-                        ip, port = client.handler.addr
-                        buf += f"    {i} - {ip}\n"
-                    self.print_console(buf)
-                elif args[0] == 'stop':
-                    self.print_console("Stopping server...")
-                    self.server.stop()
-                    self.print_console("Server stopped")
+        while True:
+            cmd = await lines.get()
+            if cmd is None:
+                self.server.stop()
+                break
+            try:
+                if not self.__run_command(cmd):
                     break
-                elif args[0] == 'iac':
-                    client = args[1]
-                    cmd = TelnetCommands[args[2].upper()] # DO, DONT
-                    opt = TelnetOptions[args[3].upper()]
-                    client = self.server.client_pool[int(client)]
-                    data = client.handler.options.send_one(cmd, opt)
-                    client.conn.sendall(data)
-                    hex_str = ':'.join(hex(x)[2:] for x in data)
-                    self.print_console(f"Sent {cmd.name} {opt.name} [{hex_str}] to {client}")
-                elif args[0] == 'opts':
-                    client = args[1]
-                    client = self.server.client_pool[int(client)]
-                    self.print_console(f"Client Options: {client.handler.options}")
-                elif args[0] == 'kick':
-                    client = args[1]
-                    client = self.server.client_pool[int(client)]
-                    self.print_console(f"Kicking client {client}")
-                    client.hard_kill_signal.set()
-                    client.client_thread.join()
-                    self.server.client_pool.remove(client)
-                    self.print_console(f"Client {client} kicked")
-                else:
-                    self.print_console(f"Unknown command: {cmd}")
-        except KeyboardInterrupt:
-            print("\rKeyboard interrupt detected, stopping server...")
+            except Exception as e:
+                # A typo such as "kick 3" must not take the console down with it
+                self.print_console(f"Command failed: {cmd} ({type(e).__name__}: {e})")
+
+    def __run_command(self, cmd: str) -> bool:
+        """
+        Run one console command, returns False once the console should exit
+        """
+        args = cmd.split(" ")
+        if args[0] == 'clients':
+            buf = "Connected clients:\n"
+            for i,client in enumerate(self.server.client_pool):
+                ip = client.handler.addr[0] # IPv6 peers are (host, port, flowinfo, scope_id)
+                buf += f"    {i} - {ip}\n"
+            self.print_console(buf)
+        elif args[0] == 'stop':
+            self.print_console("Stopping server...")
             self.server.stop()
-            print("Server stopped")
+            self.print_console("Server stopped")
+            return False
+        elif args[0] == 'iac':
+            client = args[1]
+            cmd = TelnetCommands[args[2].upper()] # DO, DONT
+            opt = TelnetOptions[args[3].upper()]
+            client = self.server.client_pool[int(client)]
+            data = client.handler.options.send_one(cmd, opt)
+            client.writer.write(data)
+            hex_str = ':'.join(hex(x)[2:] for x in data)
+            self.print_console(f"Sent {cmd.name} {opt.name} [{hex_str}] to {client}")
+        elif args[0] == 'opts':
+            client = args[1]
+            client = self.server.client_pool[int(client)]
+            self.print_console(f"Client Options: {client.handler.options}")
+        elif args[0] == 'kick':
+            client = args[1]
+            client = self.server.client_pool[int(client)]
+            self.print_console(f"Kicking client {client}")
+            client.handler.close()
+            self.print_console(f"Client {client} kicked")
+        else:
+            self.print_console(f"Unknown command: {cmd}")
+        return True
 
 class ClientState(Enum):
     CONNECT = 0
@@ -163,43 +242,34 @@ class ClientState(Enum):
     AUTH = 2
 
 class ClientHandler:
-    def __init__(self, conn, addr, signal):
-        self.conn = conn
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, addr):
+        self.reader = reader
+        self.writer = writer
         self.addr = addr
-        self.signal = signal
+        self.closed = False
         self.options = ClientOptions()
-        self.dumbterm = DumbTerminal(conn, self.options)
+        self._pending = b"" # Start of an IAC sequence cut off at the end of the last read
+        self.dumbterm = DumbTerminal(reader, writer, self.options)
         self.state: ClientState = ClientState.CONNECT
 
         self.events = {}
 
         self.client = None
 
-    def run_threaded(self) -> threading.Thread:
-        thread = threading.Thread(
-            target=self.run,
-            daemon=True
-        )
-        watchdog_thread = threading.Thread(
-            target=self.watchdog,
-            daemon=True
-        )
-        thread.start()
-        watchdog_thread.start()
-        return thread
-
-    def watchdog(self):
-        while not self.signal.is_set():
-            time.sleep(1)
-        self.conn.close()
-
-    def __process_opts(self, data: bytes) -> bool:
-        if data[0] != TelnetCommands.IAC.value:
-            return False
-        res = self.options.iac(data)
+    def __process_opts(self, data: bytes) -> bytes:
+        """
+        Answer any option negotiation in data and return the remaining application data
+        """
+        if self._pending:
+            data = self._pending + data
+        res, app, pos = self.options.iac(data)
+        self._pending = data[pos:]
+        if len(self._pending) > _MAX_PENDING:
+            # A subnegotiation that never ends, don't let it grow without bound
+            self._pending = b""
         if res:
-            self.conn.sendall(res)
-        return True
+            self.writer.write(res)
+        return app
 
     def on(self, event, callback):
         self.events[event] = callback
@@ -208,39 +278,51 @@ class ClientHandler:
         if event in self.events:
             self.events[event](*args, **kwargs)
 
+    def call_later(self, delay: float, func):
+        """
+        Run func on the event loop after delay seconds, unless the client is gone by then
+        """
+        def callback():
+            if self.closed:
+                return
+            try:
+                func()
+            except Exception:
+                traceback.print_exc()
+                self.close()
+        asyncio.get_running_loop().call_later(delay, callback)
+
     def close(self):
-        self.signal.set()
+        # Closing the transport feeds EOF to the reader, which ends run()
+        self.closed = True
+        self.writer.close()
 
-    def run(self):
-        # Send initial options
-        self.conn.settimeout(1)
+    async def run(self):
         try:
-            self.__process_opts(self.conn.recv(1024)) # Process initial options (If there are any)
-        except socket.timeout:
-            pass
-        self.conn.sendall(self.options.send(
-            (TelnetCommands.WILL, TelnetOptions.ECHO),              # Please disable local echo
-            (TelnetCommands.WILL, TelnetOptions.SUPPRESS_GO_AHEAD), # Please suppress go ahead
-            (TelnetCommands.DO, TelnetOptions.NEGOTIATE_ABOUT_WINDOW_SIZE),     # Please send terminal type
-        ))
+            # Send initial options
+            self.writer.write(_INITIAL_HANDSHAKE)
 
-        self.client = Client(self)
-        self.__dispatch_event("connect")
+            self.client = Client(self)
+            self.__dispatch_event("connect")
 
-        while not self.signal.is_set():
-            self.conn.settimeout(1)
-            try:
-                data = self.conn.recv(1024)
+            while not self.closed:
+                await self.writer.drain()
+                data = await self.reader.read(4096)
                 if not data:
                     break
-                if self.__process_opts(data):
-                    continue
 
-                self.__dispatch_event("data", data)
-            except socket.timeout:
-                continue
-            except OSError: 
-                break
-        self.signal.set()
-        self.conn.close()
-        
\ No newline at end of file
+                data = self.__process_opts(data)
+                if data:
+                    self.dumbterm.feed(data)
+                    self.__dispatch_event("data", data)
+        except ConnectionError:
+            pass
+        except Exception:
+            traceback.print_exc() # Only this client is dropped
+        finally:
+            self.close()
+            self.dumbterm.feed_eof()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
@@ -7,9 +7,9 @@
 # LICENSE.md file at the root of the source code directory
 # --------------------------------------------------------------------------------
 
-from enum import Enum
+from enum import IntEnum
 
-class TelnetCommands(Enum):
+class TelnetCommands(IntEnum):
     SE = 240
     NOP = 241
     DATA_MARK = 242
@@ -27,7 +27,7 @@ class TelnetCommands(Enum):
     DONT = 254
     IAC = 255
 
-class TelnetOptions(Enum):
+class TelnetOptions(IntEnum):
     BINARY_TRANSMISSION = 0
     ECHO = 1
     RECONNECTION = 2